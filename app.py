@@ -1,60 +1,462 @@
 # app.py
 # -*- coding: utf-8 -*-
-import os, json, hashlib
-from typing import List, Tuple, Dict
-from dataclasses import dataclass
+import os, sys, gzip, json, time, queue, threading
+import multiprocessing as mp
+from multiprocessing import resource_tracker, shared_memory
+from array import array
+from typing import List, Tuple, Dict, Optional
+from urllib.parse import urlencode
+from dataclasses import dataclass, field
 
 import mss
+import numpy as np
 from PIL import Image
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from PySide6 import QtWidgets, QtCore, QtGui
-import html as _html
 
 # ====== 基本設定 ======
-POLL_MS = 300								# キャプチャ間隔(ms)
+POLL_MS = 500								# キャプチャ間隔の初期値(ms)
+POLL_MIN_MS = 150							# チャットが流れている間はここまで詰める
+POLL_MAX_MS = 2000							# 変化がない間はここまで間隔を空ける
+FLUSH_MS = 600								# 新着行をまとめて翻訳に出すまでの待ち(ms)
+MAX_BATCH = 32								# この行数たまったら待たずに翻訳へ
+OCR_POLL_MS = 30							# OCR プロセスの結果を取りに行く間隔(ms)
+OCR_TIMEOUT_S = 15							# 1フレームの OCR がこれ以上かかったら子プロセスを作り直す（起動直後の読込も含む）
+OCR_MAX_RESTARTS = 5						# 続けてこの回数落ちたら OCR を止める（再起動の待ちは 1,2,4,8,16 秒）
 CONFIG_PATH = "config.json"					# 設定保存先
 TARGET_LANG = "JA"							# DeepLの出力言語（日本語固定）
 ALLOWED_SRC = {"EN", "ZH", "KO"}			# この言語だけ日本語に翻訳（その他は原文表示）
-
-# ====== OCR（pytesseract） ======
+_TAG_COLOR = {"[EN]": "#4fc3f7", "[ZH]": "#ffca28", "[KO]": "#81c784"}	# ログの行頭タグ -> 色（水色 / 黄 / 緑）
+LINE_STORE_MAX = 4096						# 既出行・翻訳結果の保持上限（超えたら古い半分を捨てる）
+GZIP_MIN_BYTES = 512						# DeepL への送信がこのサイズ以上なら gzip 圧縮
+OCR_LANGS = "jpn+eng"						# Tesseractの既定言語（優先順: 環境変数 OCR_LANGS > config.json の ocr_langs > これ）
+
+# ====== OCR（tesserocr / pytesseract） ======
+# 1ページ程度の認識では OpenMP のスレッド協調がむしろ遅く、Qt のイベントループも圧迫するので 1 スレッドに固定
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+try:
+	# 常駐 API（プロセス起動・一時ファイル・traineddata 再読込が毎回不要）
+	from tesserocr import PyTessBaseAPI, PSM
+	_TESSEROCR_OK = True
+except Exception:
+	_TESSEROCR_OK = False
 try:
 	from pytesseract import image_to_string
 	_OCR_OK = True
 except Exception:
 	_OCR_OK = False
 
-def ocr_lines(pil_img: Image.Image) -> List[str]:
-	# グレースケール＋多言語（日本語・英語・中(簡/繁)・韓）
-	if not _OCR_OK:
+def create_tess_api(lang: str):
+	# tesserocr が使えれば API を1つ作って使い回す。使えなければ None（pytesseract にフォールバック）
+	if not _TESSEROCR_OK:
+		return None
+	try:
+		return PyTessBaseAPI(lang=lang, psm=PSM.AUTO)
+	except Exception:
+		return None
+
+def ocr_lines(pil_img: Image.Image, lang: str = OCR_LANGS, api=None) -> List[str]:
+	# 二値化済み画像＋指定言語（既定は日本語・英語のみ。言語が増えるほどモデル読込と認識が重くなる）
+	if api is not None:
+		api.SetImage(pil_img)
+		text = api.GetUTF8Text()
+	elif _OCR_OK:
+		text = image_to_string(pil_img, lang=lang)
+	else:
 		return []
-	gray = pil_img.convert("L")
-	# Tesseractの言語パックがない言語は自動的に無視される
-	text = image_to_string(gray, lang="jpn+eng+chi_sim+chi_tra+kor")
 	lines = [ln.strip() for ln in text.splitlines()]
 	return [ln for ln in lines if ln]
 
-# ====== ユーティリティ ======
-def sha1(s: str) -> str:
-	return hashlib.sha1(s.encode("utf-8", "ignore")).hexdigest()
+# ====== OCR プロセス ======
+def _ocr_shared(shm: shared_memory.SharedMemory, shape: Tuple[int, int], lang: str, api) -> List[str]:
+	# 共有メモリ上の二値画像をコピーせずに読む（戻るときにバッファ参照は解放される）
+	arr = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+	return ocr_lines(Image.fromarray(arr), lang, api)
+
+def _ocr_worker(in_q: mp.Queue, out_q: mp.Queue, lang: str):
+	# 子プロセス側：Tesseract API はここで1つだけ作る。None を受け取ったら終了
+	api = create_tess_api(lang)
+	shm = None
+	while True:
+		msg = in_q.get()
+		if msg is None:
+			break
+		seq, shape, shm_name = msg
+		try:
+			if shm is None or shm.name != shm_name:
+				if shm is not None:
+					shm.close()
+				shm = shared_memory.SharedMemory(name=shm_name)
+			out_q.put((seq, _ocr_shared(shm, shape, lang, api), None))
+		except Exception as e:
+			out_q.put((seq, [], str(e)))
+	if shm is not None:
+		shm.close()
+	if api is not None:
+		api.End()
+
+class OcrProcess:
+	# OCR を別プロセスで回す。画像は共有メモリで渡し、同時に処理中のフレームは1枚だけ
+	def __init__(self, lang: str):
+		self._lang = lang
+		self._proc = None
+		self._shm = None
+		self._view = None
+		self._seq = 0
+		self.busy = False
+		self._submitted_at = 0.0
+		self._failures = 0		# 連続で落ちた回数（結果が返れば 0 に戻す）
+		self._retry_at = None	# 子プロセスが落ちている間の再起動予定時刻（None かつ _proc なしなら停止）
+		self._start()
+
+	def _start(self):
+		if os.name == "posix":
+			# 子が自前の resource_tracker を立てると、子の終了時に共有メモリを消されてしまうので先に親で起動
+			resource_tracker.ensure_running()
+		self._in_q = mp.Queue()
+		self._out_q = mp.Queue()
+		self._proc = mp.Process(target=_ocr_worker, args=(self._in_q, self._out_q, self._lang), daemon=True)
+		self._proc.start()
+
+	def _stop(self):
+		if self._proc.is_alive():
+			self._proc.terminate()
+		self._proc.join(1)
+		self._proc = None
+		# 子が途中で消えたキューは使い回さない（終了時に送信スレッドを待たない）
+		self._in_q.cancel_join_thread()
+		self._in_q.close()
+		self._out_q.close()
+
+	def available(self) -> bool:
+		# 新しいフレームを受け付けられるか（処理中・再起動待ち・停止中は False）
+		if self.busy:
+			return False
+		if self._proc is None:
+			if self._retry_at is None or time.monotonic() < self._retry_at:
+				return False
+			self._retry_at = None
+			self._start()
+		return True
+
+	def _release_shm(self):
+		self._view = None
+		if self._shm is not None:
+			self._shm.close()
+			try:
+				self._shm.unlink()
+			except FileNotFoundError:
+				pass
+			self._shm = None
+
+	def buffer(self, shape: Tuple[int, int]) -> np.ndarray:
+		# 二値画像の書き込み先（範囲サイズが変わったときだけ作り直す。busy の間は呼ばない）
+		if self._view is None or self._view.shape != shape:
+			self._release_shm()
+			self._shm = shared_memory.SharedMemory(create=True, size=shape[0] * shape[1])
+			self._view = np.ndarray(shape, dtype=np.uint8, buffer=self._shm.buf)
+		return self._view
+
+	def submit(self):
+		self._seq += 1
+		self._in_q.put((self._seq, self._view.shape, self._shm.name))
+		self._submitted_at = time.monotonic()
+		self.busy = True
+
+	def poll(self) -> Optional[Tuple[List[str], Optional[str]]]:
+		# 結果があれば (行, エラー) を返す。まだなら None
+		if not self.busy:
+			return None
+		try:
+			seq, lines, err = self._out_q.get_nowait()
+		except queue.Empty:
+			alive = self._proc.is_alive()
+			if alive and time.monotonic() - self._submitted_at < OCR_TIMEOUT_S:
+				return None
+			# 落ちた・応答しない子は作り直す。続けて落ちるなら間隔を空け、上限を超えたら止める
+			reason = "応答しない" if alive else "終了した"
+			self._stop()
+			self.busy = False
+			self._failures += 1
+			if self._failures > OCR_MAX_RESTARTS:
+				return [], f"OCR プロセスが{reason}ため OCR を停止しました（{self._failures} 回連続）"
+			delay = 2 ** (self._failures - 1)
+			self._retry_at = time.monotonic() + delay
+			return [], f"OCR プロセスが{reason}ため {delay} 秒後に再起動します"
+		if seq != self._seq:
+			return None
+		self.busy = False
+		self._failures = 0
+		return lines, err
+
+	def close(self):
+		if self._proc is not None:
+			if self._proc.is_alive():
+				self._in_q.put(None)
+				self._proc.join(3)
+			self._stop()
+		self._release_shm()
+
+# ====== 前処理（NumPy / Numba） ======
+try:
+	# あれば輝度化・二値化を JIT で1パスのループにし、出力は使い回しのバッファへ書く
+	from numba import njit, prange
+
+	# 凍結ビルドではソースが見つからずキャッシュできないので、その場合はキャッシュなし
+	_jit = njit(parallel=True, cache=not getattr(sys, "frozen", False))
+
+	@_jit
+	def _bgra_to_luma_jit(src, dst):
+		h, w = dst.shape
+		for y in prange(h):
+			for x in range(w):
+				dst[y, x] = np.uint8((77 * np.uint16(src[y, x, 2]) + 150 * np.uint16(src[y, x, 1]) + 29 * np.uint16(src[y, x, 0])) >> 8)
+
+	@_jit
+	def _binarize_jit(gray, dst, thr):
+		h, w = dst.shape
+		for y in prange(h):
+			for x in range(w):
+				dst[y, x] = 0 if gray[y, x] > thr else 255
+
+	_NUMBA_OK = True
+except Exception:
+	_NUMBA_OK = False
+
+# JIT コンパイルが済むまでは NumPy 版で処理する（初回 tick で GUI スレッドを止めない）
+_JIT_READY = threading.Event()
+
+def warm_up_kernels():
+	# 起動時に別スレッドから呼ぶ。mss・dxcam が渡しうる配列型（書き込み可/読み取り専用 × 連続/切り出し）をまとめてコンパイル
+	if not _NUMBA_OK:
+		return
+	try:
+		writable = np.zeros((2, 2, 4), dtype=np.uint8)
+		readonly = np.frombuffer(bytes(16), dtype=np.uint8).reshape(2, 2, 4)
+		sliced = np.zeros((2, 3, 4), dtype=np.uint8)[:, :2]
+		readonly_sliced = np.frombuffer(bytes(24), dtype=np.uint8).reshape(2, 3, 4)[:, :2]	# dxcam は bytes 上のフレームを範囲で切り出す
+		dst = np.empty((2, 2), dtype=np.uint8)
+		for src in (writable, readonly, sliced, readonly_sliced):
+			_bgra_to_luma_jit(src, dst)
+		_binarize_jit(dst, np.empty_like(dst), 127)
+	except Exception:
+		return
+	_JIT_READY.set()
+
+def bgra_to_luma(arr: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+	# BT.601 の固定小数点近似（(77R + 150G + 29B) >> 8）。uint16 で計算して桁あふれを防ぐ
+	if _JIT_READY.is_set():
+		if out is None:
+			out = np.empty(arr.shape[:2], dtype=np.uint8)
+		_bgra_to_luma_jit(arr, out)
+		return out
+	b = arr[..., 0].astype(np.uint16)
+	g = arr[..., 1].astype(np.uint16)
+	r = arr[..., 2].astype(np.uint16)
+	return ((r * 77 + g * 150 + b * 29) >> 8).astype(np.uint8)
+
+def otsu_threshold(gray: np.ndarray) -> int:
+	# 大津の二値化：クラス間分散が最大になる閾値を求める
+	hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+	w0 = np.cumsum(hist)
+	w1 = w0[-1] - w0
+	mu = np.cumsum(hist * np.arange(256))
+	with np.errstate(divide="ignore", invalid="ignore"):
+		m0 = mu / w0
+		m1 = (mu[-1] - mu) / w1
+		between = w0 * w1 * (m0 - m1) ** 2
+	return int(np.nanargmax(between)) if np.any(np.isfinite(between)) else 127
+
+def binarize(gray: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+	# チャット文字は暗い背景に明るい文字なので、白地に黒文字へ反転して Tesseract に渡す
+	thr = otsu_threshold(gray)
+	if _JIT_READY.is_set():
+		if out is None:
+			out = np.empty_like(gray)
+		_binarize_jit(gray, out, thr)
+		return out
+	return np.where(gray > thr, 0, 255).astype(np.uint8)
+
+def frame_signature(gray: np.ndarray, n: int = 32) -> int:
+	# n×n ブロック平均を粗く量子化してハッシュ化（合成時の微小なちらつきでは変わらない）
+	h, w = gray.shape
+	if h < n or w < n:
+		return hash(gray.tobytes())
+	ys = (np.arange(n) * h) // n
+	xs = (np.arange(n) * w) // n
+	sums = np.add.reduceat(np.add.reduceat(gray.astype(np.uint32), ys, axis=0), xs, axis=1)
+	counts = np.outer(np.diff(ys, append=h), np.diff(xs, append=w)).astype(np.uint32)
+	return hash(((sums // counts) >> 2).astype(np.uint8).tobytes())
+
+# ====== キャプチャ（dxcam / mss） ======
+try:
+	# Windows では DXGI Desktop Duplication（合成済みサーフェスをそのまま受け取る）を優先
+	import dxcam
+	_DXCAM_OK = sys.platform == "win32"
+except Exception:
+	_DXCAM_OK = False
+
+class MssCapture:
+	def __init__(self):
+		self._sct = mss.mss()
+		self._mon = None
+
+	def set_region(self, rect: Tuple[int, int, int, int]):
+		l, t, r, b = rect
+		self._mon = {"left": l, "top": t, "width": r - l, "height": b - t}
+
+	def grab(self) -> Optional[np.ndarray]:
+		raw = self._sct.grab(self._mon)
+		# raw.bgra は bytes(raw.raw) のコピーなので、元の bytearray を NumPy でそのまま読む（コピーなし）
+		return np.frombuffer(raw.raw, dtype=np.uint8).reshape(raw.height, raw.width, 4)
+
+class DxcamCapture:
+	def __init__(self):
+		self._cam = dxcam.create(output_color="BGRA")
+		self._region = None
+		self._fallback = MssCapture()	# プライマリ以外のモニタにかかる範囲は mss で
+		self._use_fallback = False
+		self._last = None		# 直近に取れたフレーム（画面更新がない間はこれを返す）
+
+	def set_region(self, rect: Tuple[int, int, int, int]):
+		l, t, r, b = rect
+		# dxcam の region はプライマリ出力内の座標のみ（仮想スクリーンの原点＝プライマリ左上）
+		self._use_fallback = not (0 <= l < r <= self._cam.width and 0 <= t < b <= self._cam.height)
+		self._fallback.set_region(rect)
+		self._region = (l, t, r, b)
+		self._last = None
+
+	def grab(self) -> Optional[np.ndarray]:
+		if self._use_fallback:
+			return self._fallback.grab()
+		# 前回から画面更新がなければ dxcam は None を返すので、直近のフレームを返す（変化の判定はフレーム署名に任せる）
+		frame = self._cam.grab(region=self._region)
+		if frame is not None:
+			self._last = frame
+		elif self._last is None:
+			# 範囲を変えた直後に画面が静止していても、最初の1枚は必ず mss で取る
+			self._last = self._fallback.grab()
+		return self._last
+
+def create_capture():
+	if _DXCAM_OK:
+		try:
+			return DxcamCapture()
+		except Exception:
+			pass
+	return MssCapture()
 
 # ====== 設定 ======
+try:
+	# あれば orjson（Rust 実装）で読み書き。なければ標準の json
+	import orjson
+	_ORJSON_OK = True
+except Exception:
+	_ORJSON_OK = False
+
 @dataclass
 class AppConfig:
 	capture_rect: Tuple[int, int, int, int] = (40, 830, 780, 1070)	# (l,t,r,b)
+	ocr_langs: Optional[str] = None	# config.json に書かれていたときだけ持つ（例: "jpn+eng+chi_sim+chi_tra+kor"）
+	version: int = field(default=0, compare=False, repr=False)	# capture_rect を変えるたびに +1
 
 	@staticmethod
 	def load(path: str) -> "AppConfig":
 		if os.path.exists(path):
-			with open(path, "r", encoding="utf-8") as f:
-				j = json.load(f)
-			return AppConfig(tuple(j.get("capture_rect", (40,830,780,1070))))
+			with open(path, "rb") as f:
+				data = f.read()
+			j = orjson.loads(data) if _ORJSON_OK else json.loads(data)
+			return AppConfig(
+				tuple(j.get("capture_rect", (40,830,780,1070))),
+				j.get("ocr_langs"),
+			)
 		return AppConfig()
 
+	def effective_ocr_langs(self) -> str:
+		# 環境変数があればそれを優先（config.json には書き込まない）
+		return os.getenv("OCR_LANGS") or self.ocr_langs or OCR_LANGS
+
+	def set_capture_rect(self, rect: Tuple[int, int, int, int]):
+		# Worker はこの番号を見てキャプチャ範囲を作り直す
+		self.capture_rect = rect
+		self.version += 1
+
 	def save(self, path: str):
-		with open(path, "w", encoding="utf-8") as f:
-			json.dump({"capture_rect": list(self.capture_rect)}, f, ensure_ascii=False, indent=2)
+		obj = {"capture_rect": list(self.capture_rect)}
+		if self.ocr_langs is not None:
+			obj["ocr_langs"] = self.ocr_langs
+		if _ORJSON_OK:
+			data = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+		else:
+			data = json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+		with open(path, "wb") as f:
+			f.write(data)
+
+# ====== 行ストア ======
+class LineStore:
+	# セッション中に見た行を列指向で持つ（原文 -> 行番号、言語コードと表示テキストは行番号で引く配列側）
+	__slots__ = ("idx", "langs", "blob", "spans")
+
+	def __init__(self):
+		self.idx: Dict[str, int] = {}	# 原文 -> 行番号
+		self.langs = bytearray()		# 1行2バイトの検出言語（未翻訳は b"\0\0"）
+		self.blob = bytearray()			# 表示テキスト(UTF-8)の連結
+		self.spans = array("q")			# 1行につき (開始, 終了) の blob 内オフセット（未翻訳は -1）
+
+	def add(self, line: str) -> bool:
+		# 初めて見た行なら登録して True
+		if line in self.idx:
+			return False
+		self.idx[sys.intern(line)] = len(self.idx)
+		self.langs += b"\0\0"
+		self.spans.extend((-1, -1))
+		if len(self.idx) > LINE_STORE_MAX:
+			self._compact(LINE_STORE_MAX // 2)
+		return True
+
+	def _compact(self, keep: int):
+		# 古い行（登録順）を捨て、新しい keep 行だけで配列を詰め直す。チャット欄から消えて久しい行なので再表示の心配はない
+		cut = len(self.idx) - keep
+		idx: Dict[str, int] = {}
+		langs = bytearray()
+		blob = bytearray()
+		spans = array("q")
+		for line, row in self.idx.items():
+			if row < cut:
+				continue
+			idx[line] = row - cut
+			langs += self.langs[2 * row:2 * row + 2]
+			start, end = self.spans[2 * row], self.spans[2 * row + 1]
+			if start < 0:
+				spans.extend((-1, -1))
+			else:
+				spans.extend((len(blob), len(blob) + end - start))
+				blob += self.blob[start:end]
+		self.idx, self.langs, self.blob, self.spans = idx, langs, blob, spans
+
+	def set(self, line: str, lang: str, shown: str):
+		self.add(line)
+		row = self.idx[line]
+		self.langs[2 * row:2 * row + 2] = lang.encode("ascii", "ignore")[:2].ljust(2, b"\0")
+		start = len(self.blob)
+		self.blob += shown.encode("utf-8")
+		self.spans[2 * row] = start
+		self.spans[2 * row + 1] = len(self.blob)
+
+	def get(self, line: str) -> Optional[Tuple[str, str]]:
+		# 翻訳済みなら (検出言語, 表示テキスト)、未登録・未翻訳なら None
+		row = self.idx.get(line)
+		if row is None:
+			return None
+		start, end = self.spans[2 * row], self.spans[2 * row + 1]
+		if start < 0:
+			return None
+		lang = self.langs[2 * row:2 * row + 2].rstrip(b"\0").decode("ascii")
+		return lang, self.blob[start:end].decode("utf-8")
 
 # ====== DeepL 翻訳 ======
 class DeepLTranslator:
@@ -62,7 +464,24 @@ class DeepLTranslator:
 		load_dotenv()
 		self.api_key = os.getenv("DEEPL_API_KEY", "")
 		self.endpoint = os.getenv("DEEPL_ENDPOINT", "https://api-free.deepl.com/v2/translate")
-		self.cache: Dict[str, Tuple[str, str]] = {}	# 原文 -> (検出言語, 表示テキスト)
+		# 接続を使い回して毎回の TCP+TLS ハンドシェイクを省く
+		self.session = requests.Session()
+		self.session.headers["Authorization"] = f"DeepL-Auth-Key {self.api_key}"
+		retry = Retry(
+			total=2,
+			backoff_factor=0.3,
+			status_forcelist=(429, 500, 502, 503, 504),
+			allowed_methods=frozenset({"POST"}),
+		)
+		self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retry))
+		self.store = LineStore()	# 既出判定と翻訳結果をまとめて保持（セッション中だけ）
+		self._lock = threading.Lock()
+		self._gzip = True	# 圧縮ボディを断られたら以後は無圧縮
+
+	def mark_seen(self, lines: List[str]) -> List[str]:
+		# セッション中に初めて見た行だけを返す
+		with self._lock:
+			return [ln for ln in lines if self.store.add(ln)]
 
 	def translate_batch(self, lines: List[str]) -> List[str]:
 		if not lines:
@@ -71,43 +490,125 @@ class DeepLTranslator:
 			# 未設定なら原文返し
 			return lines
 
-		# 送信は未キャッシュのみ
+		# 送信は未翻訳のみ（ストアはワーカースレッドから並行して触るのでロック下で）
+		shown = {}
 		to_send = []
 		index_map = []
-		for i, ln in enumerate(lines):
-			if ln in self.cache:
-				continue
-			to_send.append(("text", ln))
-			index_map.append(i)
+		with self._lock:
+			for i, ln in enumerate(lines):
+				hit = self.store.get(ln)
+				if hit is not None:
+					shown[ln] = hit[1]
+					continue
+				to_send.append(("text", ln))
+				index_map.append(i)
 
 		if to_send:
 			to_send.append(("target_lang", TARGET_LANG))
-			resp = requests.post(
-				self.endpoint,
-				data=to_send,
-				headers={"Authorization": f"DeepL-Auth-Key {self.api_key}"},
-				timeout=12
-			)
+			resp = self._post(urlencode(to_send).encode("utf-8"))
 			resp.raise_for_status()
 			j = resp.json()
 			trans = j.get("translations", [])
-			for idx, tr in enumerate(trans):
-				orig_i = index_map[idx]
-				src = (tr.get("detected_source_language") or "").upper()
-				text_ja = tr.get("text", lines[orig_i])
-				if src in ALLOWED_SRC:
-					# 言語インジケータ付けて保存
-					self.cache[lines[orig_i]] = (src, f"[{src}] {text_ja}")
-				else:
-					self.cache[lines[orig_i]] = (src, lines[orig_i])
-
-		out = []
-		for ln in lines:
-			src, shown = self.cache.get(ln, ("", ln))
-			out.append(shown)
-		return out
+			with self._lock:
+				for idx, tr in enumerate(trans):
+					orig_i = index_map[idx]
+					src = (tr.get("detected_source_language") or "").upper()
+					text_ja = tr.get("text", lines[orig_i])
+					if src in ALLOWED_SRC:
+						# 言語インジケータ付けて保存
+						text = f"[{src}] {text_ja}"
+					else:
+						text = lines[orig_i]
+					self.store.set(lines[orig_i], src, text)
+					shown[lines[orig_i]] = text
+
+		return [shown.get(ln, ln) for ln in lines]
+
+	def _post(self, body: bytes) -> requests.Response:
+		headers = {"Content-Type": "application/x-www-form-urlencoded"}
+		if self._gzip and len(body) >= GZIP_MIN_BYTES:
+			# 行数が多いときはボディを gzip で送る（レスポンスの gzip は requests が自動で展開）
+			resp = self.session.post(
+				self.endpoint,
+				data=gzip.compress(body, compresslevel=1),
+				headers={**headers, "Content-Encoding": "gzip"},
+				timeout=12,
+			)
+			if resp.status_code not in (400, 415):
+				return resp
+			# 圧縮ボディを読めないエンドポイントは空フォーム扱いで 400 を返すので、無圧縮で1回だけ送り直す
+			# （断られたリクエストは翻訳を返していないので二重翻訳にはならない）
+			resp = self.session.post(self.endpoint, data=body, headers=headers, timeout=12)
+			if resp.ok:
+				# 無圧縮なら通った＝圧縮が原因なので、以後は無圧縮
+				with self._lock:
+					self._gzip = False
+			return resp
+		return self.session.post(self.endpoint, data=body, headers=headers, timeout=12)
+
+# ====== 非同期翻訳（QThreadPool） ======
+class _TranslateSignals(QtCore.QObject):
+	done = QtCore.Signal(int, list)	# (通し番号, 表示行)
+
+class TranslateTask(QtCore.QRunnable):
+	# DeepL への HTTP をスレッドプールで実行し、結果を通し番号付きで返す
+	def __init__(self, translator: DeepLTranslator, seq: int, lines: List[str], signals: _TranslateSignals):
+		super().__init__()
+		self.translator = translator
+		self.seq = seq
+		self.lines = lines
+		self.signals = signals
+
+	def run(self):
+		try:
+			out = self.translator.translate_batch(self.lines)
+		except Exception as e:
+			out = [f"(エラー) {e}"]
+		self.signals.done.emit(self.seq, out)
 
 # ====== スクショ式ピッカー（フルスクでもOK） ======
+class SelectionLabel(QtWidgets.QLabel):
+	# スクショの上に選択枠を自前で描く。再描画は新旧の枠を囲む範囲だけ、間隔は1フレーム(16ms)以上空ける
+	_FRAME_MS = 16
+
+	def __init__(self, pix: QtGui.QPixmap):
+		super().__init__()
+		self._pix = pix
+		self.setPixmap(pix)	# サイズ決め用（描画は paintEvent で）
+		self.setAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignTop)
+		self._pen = QtGui.QPen(QtGui.QColor("#4fc3f7"), 2)
+		self._sel_rect = QtCore.QRect()
+		self._pending = QtCore.QRect()
+		self._clock = QtCore.QElapsedTimer()
+		self._clock.start()
+		self._flush = QtCore.QTimer(self)
+		self._flush.setSingleShot(True)
+		self._flush.timeout.connect(self._apply)
+
+	def set_selection(self, rect: QtCore.QRect):
+		self._pending = rect
+		elapsed = self._clock.elapsed()
+		if elapsed < self._FRAME_MS:
+			# 間引いた分も最後の位置は必ず描く
+			if not self._flush.isActive():
+				self._flush.start(self._FRAME_MS - elapsed)
+			return
+		self._apply()
+
+	def _apply(self):
+		old, self._sel_rect = self._sel_rect, self._pending
+		self.update(old.united(self._sel_rect).adjusted(-2, -2, 2, 2))
+		self._clock.restart()
+
+	def paintEvent(self, ev):
+		p = QtGui.QPainter(self)
+		r = ev.rect()
+		p.drawPixmap(r, self._pix, r)
+		if not self._sel_rect.isNull():
+			p.setPen(self._pen)
+			p.drawRect(self._sel_rect)
+		p.end()
+
 class ScreenshotPicker(QtWidgets.QDialog):
 	rectSelected = QtCore.Signal(tuple)	# (l,t,r,b) virtual screen 座標
 
@@ -120,23 +621,19 @@ class ScreenshotPicker(QtWidgets.QDialog):
 		self._sct = mss.mss()
 		mon = self._sct.monitors[0]	# 仮想スクリーン
 		raw = self._sct.grab(mon)
-		img = Image.frombytes("RGB", raw.size, raw.rgb)
 
-		# PIL -> QImage
-		data = img.tobytes()
-		qimg = QtGui.QImage(data, img.width, img.height, img.width * 3, QtGui.QImage.Format_RGB888)
+		# mss の BGRA を並べ替えずに QImage へ（RGB32 はリトルエンディアンで BGRA 並び。raw.bgra 取得時のコピー1回のみ）
+		data = raw.bgra
+		qimg = QtGui.QImage(data, raw.width, raw.height, raw.width * 4, QtGui.QImage.Format_RGB32)
 		self._pix = QtGui.QPixmap.fromImage(qimg)
 
-		self._label = QtWidgets.QLabel()
-		self._label.setPixmap(self._pix)
-		self._label.setAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignTop)
+		self._label = SelectionLabel(self._pix)
 
 		layout = QtWidgets.QVBoxLayout()
 		layout.setContentsMargins(0,0,0,0)
 		layout.addWidget(self._label)
 		self.setLayout(layout)
 
-		self._rubber = QtWidgets.QRubberBand(QtWidgets.QRubberBand.Rectangle, self._label)
 		self._origin = None
 
 		self.setGeometry(mon["left"], mon["top"], mon["width"], mon["height"])
@@ -147,15 +644,13 @@ class ScreenshotPicker(QtWidgets.QDialog):
 		if obj is self._label:
 			if ev.type() == QtCore.QEvent.MouseButtonPress:
 				self._origin = ev.position().toPoint()
-				self._rubber.setGeometry(QtCore.QRect(self._origin, QtCore.QSize()))
-				self._rubber.show()
+				self._label.set_selection(QtCore.QRect(self._origin, QtCore.QSize()))
 				return True
 			elif ev.type() == QtCore.QEvent.MouseMove and self._origin:
 				rect = QtCore.QRect(self._origin, ev.position().toPoint()).normalized()
-				self._rubber.setGeometry(rect)
+				self._label.set_selection(rect)
 				return True
 			elif ev.type() == QtCore.QEvent.MouseButtonRelease and self._origin:
-				self._rubber.hide()
 				end = ev.position().toPoint()
 				rect = QtCore.QRect(self._origin, end).normalized()
 				l, t, r, b = rect.left(), rect.top(), rect.right(), rect.bottom()
@@ -171,9 +666,14 @@ class LogWindow(QtWidgets.QMainWindow):
 		self.setWindowTitle("ChatLiveTranslate (OW2 / DeepL)")
 		self.resize(760, 520)
 
-		self.view = QtWidgets.QTextEdit(self)
+		# 追記専用ログなので QPlainTextEdit（ブロック単位のレイアウトで追記が軽い）
+		self.view = QtWidgets.QPlainTextEdit(self)
 		self.view.setReadOnly(True)
-		self.view.setLineWrapMode(QtWidgets.QTextEdit.WidgetWidth)
+		self.view.setLineWrapMode(QtWidgets.QPlainTextEdit.WidgetWidth)
+		self.view.setMaximumBlockCount(5000)	# 長時間でも古い行から捨ててレイアウトコストを一定に
+		# 行頭タグごとの文字書式は1回だけ作って使い回す
+		self._fmts: Dict[str, QtGui.QTextCharFormat] = {tag: self._make_fmt(color) for tag, color in _TAG_COLOR.items()}
+		self._default_fmt = self._make_fmt("#e0e0e0")	# 既定：薄グレー
 		self.setCentralWidget(self.view)
 
 		# ツールバー
@@ -198,7 +698,7 @@ class LogWindow(QtWidgets.QMainWindow):
 		font = QtGui.QFont("Meiryo", 16)
 		self.view.setFont(font)
 		self.view.setStyleSheet("""
-			QTextEdit {
+			QPlainTextEdit {
 				background-color: #1e1e1e;
 				color: #e0e0e0;
 				border: none;
@@ -219,18 +719,23 @@ class LogWindow(QtWidgets.QMainWindow):
 			return
 		cur = self.view.textCursor()
 		cur.movePosition(QtGui.QTextCursor.End)
+		cur.beginEditBlock()
 		for line in lines:
-			color = "#e0e0e0"	# 既定：薄グレー
-			if line.startswith("[EN]"):
-				color = "#4fc3f7"	# 水色
-			elif line.startswith("[ZH]"):
-				color = "#ffca28"	# 黄
-			elif line.startswith("[KO]"):
-				color = "#81c784"	# 緑
-			safe = _html.escape(line)
-			cur.insertHtml(f'<span style="color:{color}">{safe}</span><br>')
+			# HTML を組まずにプレーンテキストとして書式付きで追記
+			if not cur.atStart():
+				cur.insertBlock()
+			# タグは必ず4文字なので、先頭4文字の辞書引き1回で書式を決める
+			cur.setCharFormat(self._fmts.get(line[:4], self._default_fmt))
+			cur.insertText(line)
+		cur.endEditBlock()
 		self.view.setTextCursor(cur)
 
+	@staticmethod
+	def _make_fmt(color: str) -> QtGui.QTextCharFormat:
+		fmt = QtGui.QTextCharFormat()
+		fmt.setForeground(QtGui.QColor(color))
+		return fmt
+
 	def toggle_pause(self):
 		self.paused = not self.paused
 		self.btn_pause.setText("▶ 再開" if self.paused else "⏸ 一時停止")
@@ -243,7 +748,7 @@ class LogWindow(QtWidgets.QMainWindow):
 
 	def _on_rect_selected(self, rect_tuple):
 		l, t, r, b = rect_tuple
-		self.cfg.capture_rect = (l, t, r, b)
+		self.cfg.set_capture_rect((l, t, r, b))
 		self.cfg.save(CONFIG_PATH)
 		self.status.showMessage(f"選択: {self.cfg.capture_rect}", 3000)
 
@@ -257,52 +762,144 @@ class Worker(QtCore.QObject):
 		self.view = view
 		self._timer = QtCore.QTimer()
 		self._timer.timeout.connect(self.tick)
-		self._timer.start(POLL_MS)
-		self._sct = mss.mss()
+		self._period = POLL_MS	# 新着があれば半分に、なければ 1.25 倍に（POLL_MIN_MS〜POLL_MAX_MS）
+		self._timer.start(self._period)
+		self._capture = create_capture()
 		self.translator = DeepLTranslator()
-		self._seen_hashes = set()	# セッション中だけ保持
-
-	def _grab_image(self) -> Image.Image:
-		l, t, r, b = self.cfg.capture_rect
-		mon = {"left": l, "top": t, "width": r - l, "height": b - t}
-		raw = self._sct.grab(mon)
-		return Image.frombytes("RGB", raw.size, raw.rgb)
+		# OCR は別プロセスで。結果は短い間隔のタイマーで回収する
+		self._ocr = OcrProcess(cfg.effective_ocr_langs())
+		self._ocr_timer = QtCore.QTimer()
+		self._ocr_timer.timeout.connect(self._drain_ocr)
+		self._ocr_timer.start(OCR_POLL_MS)
+		self._last_frame_hash = 0	# 最後に OCR が成功したフレーム
+		self._inflight_hash = 0		# OCR プロセスに渡したフレーム（成功したら _last_frame_hash へ）
+		self._rect_version = -1		# cfg.version が変わったときだけキャプチャ範囲を設定し直す
+		self._luma_buf = None	# 範囲サイズが変わるまで使い回す前処理バッファ
+		# 翻訳は別スレッドで。HTTP 接続プールと同じ本数までに抑える
+		self._pool = QtCore.QThreadPool(self)
+		self._pool.setMaxThreadCount(4)
+		self._signals = _TranslateSignals()
+		self._signals.done.connect(self._on_translated, QtCore.Qt.QueuedConnection)
+		self._next_seq = 0		# 次に発行する通し番号
+		self._emit_seq = 0		# 次に表示すべき通し番号
+		self._done: Dict[int, List[str]] = {}	# 先に終わった結果の待ち合わせ
+		# 連続する新着行を1リクエストにまとめる
+		self._pending: List[str] = []
+		self._flush_timer = QtCore.QTimer()
+		self._flush_timer.setSingleShot(True)
+		self._flush_timer.timeout.connect(self._flush_pending)
+
+	def _grab_gray(self) -> Optional[np.ndarray]:
+		if self._rect_version != self.cfg.version:
+			self._capture.set_region(self.cfg.capture_rect)
+			self._rect_version = self.cfg.version
+		arr = self._capture.grab()
+		if arr is None:
+			return None
+		if self._luma_buf is None or self._luma_buf.shape != arr.shape[:2]:
+			self._luma_buf = np.empty(arr.shape[:2], dtype=np.uint8)
+		return bgra_to_luma(arr, self._luma_buf)
 
 	def tick(self):
 		if self.view.paused:
 			return
+		# 前のフレームを認識中（または OCR プロセスの再起動待ち）なら今回の取り込みは見送る
+		if not self._ocr.available():
+			return
 		try:
-			img = self._grab_image()
-			lines = ocr_lines(img)
-			# 既出行（セッション中）はスキップ
-			new_raw = []
-			for ln in lines:
-				h = sha1(ln)
-				if h in self._seen_hashes:
-					continue
-				self._seen_hashes.add(h)
-				new_raw.append(ln)
-
-			if not new_raw:
+			gray = self._grab_gray()
+			if gray is None:
+				self._adjust_period(False)
 				return
+			# 前回とほぼ同じフレームなら OCR しない（チャットが静かな間はハッシュ計算だけで済む）
+			h = frame_signature(gray)
+			if h == self._last_frame_hash:
+				self._adjust_period(False)
+				return
+			self._inflight_hash = h
+			# 二値化の結果を共有メモリへ直接書き、OCR プロセスへ通知
+			buf = self._ocr.buffer(gray.shape)
+			res = binarize(gray, buf)
+			if res is not buf:
+				buf[...] = res
+			self._ocr.submit()
+
+		except Exception as e:
+			self.new_text.emit([f"(エラー) {e}"])
 
-			out = self.translator.translate_batch(new_raw)
+	def _drain_ocr(self):
+		r = self._ocr.poll()
+		if r is None:
+			return
+		lines, err = r
+		if err:
+			# 失敗したフレームは次の tick で読み直す
+			self.new_text.emit([f"(エラー) {err}"])
+			return
+		self._last_frame_hash = self._inflight_hash
+		# 既出行（セッション中）はスキップ（翻訳結果と同じ LineStore で判定）
+		new_raw = self.translator.mark_seen(lines)
+
+		self._adjust_period(bool(new_raw))
+		if not new_raw:
+			return
+
+		# すぐには送らず FLUSH_MS 分ためてから1回で送る（最初の行からの待ちを上限とする）
+		self._pending.extend(new_raw)
+		if len(self._pending) >= MAX_BATCH:
+			self._flush_pending()
+		elif not self._flush_timer.isActive():
+			self._flush_timer.start(FLUSH_MS)
+
+	def _adjust_period(self, active: bool):
+		# 静かな間は間隔を空けて、チャットが動き出したら詰める
+		if active:
+			period = max(POLL_MIN_MS, self._period // 2)
+		else:
+			period = min(POLL_MAX_MS, int(self._period * 1.25))
+		if period != self._period:
+			self._period = period
+			self._timer.start(period)
+
+	def _flush_pending(self):
+		self._flush_timer.stop()
+		if not self._pending:
+			return
+		batch, self._pending = self._pending, []
+		# HTTP 待ちでキャプチャが止まらないようにプールへ投げる
+		self._pool.start(TranslateTask(self.translator, self._next_seq, batch, self._signals))
+		self._next_seq += 1
+
+	@QtCore.Slot(int, list)
+	def _on_translated(self, seq: int, out: List[str]):
+		# 完了順はばらつくので通し番号順に並べ直して表示する
+		self._done[seq] = out
+		while self._emit_seq in self._done:
+			out = self._done.pop(self._emit_seq)
+			self._emit_seq += 1
 			if out:
 				self.new_text.emit(out)
 
-		except Exception as e:
-			self.new_text.emit([f"(エラー) {e}"])
+	def close(self):
+		self._flush_timer.stop()
+		self._pool.clear()
+		self._pool.waitForDone(3000)
+		self._ocr_timer.stop()
+		self._ocr.close()
 
 # ====== main ======
 def main():
 	cfg = AppConfig.load(CONFIG_PATH)
 	app = QtWidgets.QApplication([])
+	threading.Thread(target=warm_up_kernels, daemon=True).start()
 	win = LogWindow(cfg)
 	worker = Worker(cfg, win)
 	worker.new_text.connect(lambda lines: (None if win.paused else win.append_lines(lines)))
+	app.aboutToQuit.connect(worker.close)
 	win.show()
 	win.status.showMessage("準備完了。『範囲選択』でチャット欄を囲んでください。", 4000)
 	app.exec()
 
 if __name__ == "__main__":
+	mp.freeze_support()
 	main()